@@ -0,0 +1,124 @@
+"""
+Benchmark: recognition throughput threaded engine vs shared-memory worker processes.
+
+Usage (dari root project, model dlib harus ada di resources/):
+    python -m benchmarks.recognition_workers --image foto.jpg --workers 4 8 16
+"""
+import argparse
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import cv2
+import dlib
+import numpy as np
+
+from modules.shared_engine import RecognitionPool, match_gallery
+
+MODEL_PATHS = (
+    "resources/shape_predictor_68_face_landmarks.dat",
+    "resources/dlib_face_recognition_resnet_model_v1.dat"
+)
+
+
+def load_frame(image_path):
+    # Same pre-processing as CameraThread: 1280x720 -> half size RGB
+    img = cv2.imread(image_path)
+    img = cv2.resize(img, (1280, 720))
+    small = cv2.resize(img, (0, 0), fx=0.5, fy=0.5)
+    rgb = cv2.cvtColor(small, cv2.COLOR_BGR2RGB)
+    rgb = np.ascontiguousarray(rgb, dtype=np.uint8)
+
+    faces = dlib.get_frontal_face_detector()(rgb, 0)
+    if len(faces) == 0:
+        h, w, _ = rgb.shape
+        rect = dlib.rectangle(w // 3, h // 4, 2 * w // 3, 3 * h // 4)
+    else:
+        rect = max(faces, key=lambda f: f.area())
+    return rgb, (rect.left(), rect.top(), rect.right(), rect.bottom())
+
+
+def make_gallery(size):
+    rng = np.random.default_rng(0)
+    return [{"name": f"ID{i}", "encoding": rng.normal(0, 0.05, 128)} for i in range(size)]
+
+
+def bench_threaded(frame, rect, database, num_threads, num_tasks):
+    matrix = np.asarray([d["encoding"] for d in database], dtype=np.float32)
+    local = threading.local()
+
+    def task(_):
+        # One model instance per thread, like one per worker process
+        if not hasattr(local, "predictor"):
+            local.predictor = dlib.shape_predictor(MODEL_PATHS[0])
+            local.face_rec_model = dlib.face_recognition_model_v1(MODEL_PATHS[1])
+        shape = local.predictor(frame, dlib.rectangle(*rect))
+        desc = np.array(local.face_rec_model.compute_face_descriptor(frame, shape), dtype=np.float32)
+        return match_gallery(matrix, desc)
+
+    with ThreadPoolExecutor(max_workers=num_threads) as pool:
+        list(pool.map(task, range(num_threads)))  # warm-up (model loading)
+
+        start = time.perf_counter()
+        list(pool.map(task, range(num_tasks)))
+        return num_tasks / (time.perf_counter() - start)
+
+
+def _drain(pool, frame, rect, num_tasks, frame_idx):
+    # Only results poll() returns count as completed; dropped tasks just free their slot
+    submitted = completed = 0
+    while submitted < num_tasks or pool.pending > 0:
+        while submitted < num_tasks and pool.submit(frame_idx, frame, [(0, rect)]):
+            submitted += 1
+            frame_idx += 1
+        results = pool.poll()
+        completed += len(results)
+        if not results:
+            time.sleep(0.0005)
+    return frame_idx, completed
+
+
+def bench_processes(frame, rect, database, num_workers, num_tasks):
+    pool = RecognitionPool(num_workers, MODEL_PATHS)
+    pool.start(frame.shape)
+    try:
+        pool.update_gallery(database)
+        frame_idx, _ = _drain(pool, frame, rect, num_workers, 0)  # warm-up (model loading)
+
+        start = time.perf_counter()
+        _, completed = _drain(pool, frame, rect, num_tasks, frame_idx)
+        elapsed = time.perf_counter() - start
+
+        if completed < num_tasks:
+            print(f">> [BENCH] {num_tasks - completed} task dibuang oleh worker (N={num_workers})")
+        return completed / elapsed
+    finally:
+        pool.stop()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Threaded vs multi-process recognition benchmark")
+    parser.add_argument("--image", required=True, help="Foto berisi satu wajah")
+    parser.add_argument("--gallery", type=int, default=10000, help="Jumlah identitas sintetis")
+    parser.add_argument("--tasks", type=int, default=400)
+    parser.add_argument("--workers", type=int, nargs="+", default=[4, 8, 16])
+    args = parser.parse_args()
+
+    if not all(os.path.exists(p) for p in MODEL_PATHS):
+        print(">> [ERROR] Model dlib tidak ditemukan di folder resources!")
+        return
+
+    frame, rect = load_frame(args.image)
+    database = make_gallery(args.gallery)
+
+    print(f">> [BENCH] CPU: {os.cpu_count()} | gallery: {args.gallery} | tasks: {args.tasks}")
+    print(f"{'N':>4} {'threads/s':>12} {'procs/s':>12} {'speedup':>9}")
+    for n in args.workers:
+        threaded = bench_threaded(frame, rect, database, n, args.tasks)
+        processes = bench_processes(frame, rect, database, n, args.tasks)
+        print(f"{n:>4} {threaded:>12.1f} {processes:>12.1f} {processes / threaded:>8.2f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,78 @@
+"""
+Replay sesi rekaman (F9 di aplikasi) untuk regression & tuning parameter.
+
+Usage (dari root project):
+    python -m benchmarks.replay_session assets/sessions/session_xxx.pkl
+    python -m benchmarks.replay_session sesi.pkl --set CONFIDENCE_THRESHOLD=2.5
+    python -m benchmarks.replay_session sesi.pkl --sweep MAX_LOST_FRAMES=3,5,8 --baseline base.json
+"""
+import argparse
+import itertools
+
+from modules.session_recorder import ENGINE_PARAMS, load_session, save_session
+from modules.session_replay import diff_metrics, load_baseline, replay_session, save_baseline
+
+
+def parse_value(text):
+    return float(text) if "." in text else int(text)
+
+
+def parse_assignments(items, multi=False):
+    params = {}
+    for item in items or []:
+        key, _, value = item.partition("=")
+        if key not in ENGINE_PARAMS:
+            raise SystemExit(f">> [ERROR] Parameter tidak dikenal: {key} (pilihan: {', '.join(ENGINE_PARAMS)})")
+        params[key] = [parse_value(v) for v in value.split(",")] if multi else parse_value(value)
+    return params
+
+
+def fmt(value):
+    if value is None: return "-"
+    return f"{value:.3f}" if isinstance(value, float) else str(value)
+
+
+def print_metrics(metrics, baseline=None):
+    if baseline is None:
+        for key, value in metrics.items():
+            print(f"   {key:<24} {fmt(value):>10}")
+        return
+
+    print(f"   {'metric':<24} {'baseline':>10} {'current':>10} {'delta':>10}")
+    for key, (base, value, delta) in diff_metrics(metrics, baseline).items():
+        print(f"   {key:<24} {fmt(base):>10} {fmt(value):>10} {fmt(delta):>10}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Deterministic replay of a recorded engine session")
+    parser.add_argument("session")
+    parser.add_argument("--set", nargs="*", help="Override, mis. CONFIDENCE_THRESHOLD=2.5")
+    parser.add_argument("--sweep", nargs="*", help="Sweep, mis. MAX_LOST_FRAMES=3,5,8")
+    parser.add_argument("--baseline", help="File JSON baseline untuk diff")
+    parser.add_argument("--save-baseline", help="Simpan metrik run pertama sebagai baseline")
+    parser.add_argument("--no-recompute", action="store_true", help="Hanya pakai stage yang ada di cache")
+    parser.add_argument("--save-cache", action="store_true", help="Tulis stage yang dihitung ulang ke file sesi")
+    args = parser.parse_args()
+
+    session = load_session(args.session)
+    fixed = parse_assignments(args.set)
+    sweep = parse_assignments(args.sweep, multi=True)
+    baseline = load_baseline(args.baseline) if args.baseline else None
+
+    keys = list(sweep)
+    for i, combo in enumerate(itertools.product(*[sweep[k] for k in keys])):
+        params = dict(fixed, **dict(zip(keys, combo)))
+        print(f">> [REPLAY] {params or 'parameter rekaman'}")
+
+        metrics = replay_session(session, params, recompute=not args.no_recompute)
+        print_metrics(metrics, baseline)
+
+        if i == 0 and args.save_baseline:
+            save_baseline(metrics, args.save_baseline)
+
+    if args.save_cache:
+        save_session(session, args.session)
+
+
+if __name__ == "__main__":
+    main()
@@ -4,12 +4,20 @@ from modules.camera_thread import CameraThread
 from modules.data_manager import DataManager 
 from PIL import Image
 import os
+import time
+import threading
+import argparse
 
 ctk.set_appearance_mode("Dark")
 ctk.set_default_color_theme("dark-blue")
 
+# UI wake-ups follow the producer: sleep until the next frame is due, then
+# re-check every FRAME_RETRY_MS until it lands. The period is learned from frame timestamps.
+FRAME_PERIOD_S = 1.0 / 25
+FRAME_RETRY_MS = 2
+
 class SmartVisionApp(ctk.CTk):
-    def __init__(self):
+    def __init__(self, num_workers=0):
         super().__init__()
 
         self.title("Smart Vision Desktop")
@@ -19,7 +27,9 @@ class SmartVisionApp(ctk.CTk):
         
         self.grid_columnconfigure(0, weight=1)
         self.grid_rowconfigure(0, weight=1)
-        self.bind("<Escape>", lambda event: self.destroy())
+        self.bind("<Escape>", lambda event: self.on_close())
+        self.protocol("WM_DELETE_WINDOW", self.on_close)
+        self.bind("<F9>", lambda event: self.toggle_recording())
 
         self.main_area = ctk.CTkFrame(self, corner_radius=0, fg_color="black")
         self.main_area.grid(row=0, column=0, sticky="nsew")
@@ -30,6 +40,19 @@ class SmartVisionApp(ctk.CTk):
         self.camera_label = ctk.CTkLabel(self.main_area, text="", fg_color="black")
         self.camera_label.grid(row=0, column=0, sticky="nsew")
 
+        # Cached display geometry, refreshed only when the area is resized
+        self.display_size = (0, 0)
+        self.main_area.bind("<Configure>", self.on_display_resize)
+
+        # Performance HUD (display latency, UI thread CPU per rendered frame, wake-ups)
+        self.hud_label = ctk.CTkLabel(
+            self.main_area,
+            text="",
+            font=("Consolas", 12),
+            text_color="#00ff00",
+            fg_color="black"
+        )
+
         self.status_label = ctk.CTkLabel(
             self.main_area, 
             text="SYSTEM READY.\nWAITING FOR INPUT.", 
@@ -60,9 +83,31 @@ class SmartVisionApp(ctk.CTk):
             db_callback=self.open_database_menu 
         )
 
-        self.camera_engine = CameraThread(video_source=0)
-        self.last_size = (0, 0)
+        self.camera_engine = CameraThread(video_source=0, on_new_frame=self.notify_new_frame,
+                                          num_workers=num_workers)
         self.db_window = None
+        self.record_path = None
+
+        # Producer only sets a thread-safe flag; the UI picks it up via after() and
+        # renders the newest frame. The camera thread never calls into Tk.
+        self.frame_ready = threading.Event()
+        self.frame_poll_job = None
+        self.last_rendered_id = 0
+        self.last_frame_time = None
+        self.frame_period = FRAME_PERIOD_S
+        self.reset_display_stats()
+
+    def on_display_resize(self, event):
+        self.display_size = (event.width, event.height)
+
+    def reset_display_stats(self):
+        self.stats_rendered = 0
+        self.stats_dropped = 0
+        self.stats_latency = 0.0
+        self.stats_wakeups = 0
+        # UI thread CPU over the whole window (polling, HUD, Tk callbacks), not just rendering
+        self.stats_cpu_start = time.thread_time()
+        self.stats_window_start = time.perf_counter()
 
     def resize_with_aspect_ratio(self, image, max_w, max_h):
         img_w, img_h = image.size
@@ -83,7 +128,8 @@ class SmartVisionApp(ctk.CTk):
     def on_db_close(self):
         if self.camera_engine:
             new_data = self.data_manager.load_database()
-            self.camera_engine.update_database(new_data)
+            thresholds = self.data_manager.get_accept_thresholds(new_data)
+            self.camera_engine.update_database(new_data, thresholds)
         
         self.db_window.destroy()
 
@@ -95,53 +141,149 @@ class SmartVisionApp(ctk.CTk):
         
         loaded_data = self.data_manager.load_database()
         
-        self.camera_engine.update_database(loaded_data)
+        thresholds = self.data_manager.get_accept_thresholds(loaded_data)
+        
+        self.camera_engine.update_database(loaded_data, thresholds)
         
         self.status_label.configure(text="INITIALIZING CAMERA...")
         self.btn_stop.place(relx=0.98, rely=0.95, anchor="se")
         self.lift()
         self.focus_force()
 
-        self.camera_engine.start_camera()
-        self.update_camera_loop()
+        self.last_rendered_id = 0
+        self.last_frame_time = None
+        self.frame_period = FRAME_PERIOD_S
+        self.frame_ready.clear()
+        self.reset_display_stats()
+        if not self.camera_engine.start_camera():
+            self.stop_process()
+            self.status_label.configure(text="CAMERA STILL STOPPING.\nTRY AGAIN.")
+            return
+        self.poll_new_frame()
+
+    def toggle_recording(self):
+        # F9: record the running session for offline replay (benchmarks/replay_session.py)
+        if self.record_path is None:
+            if not self.camera_engine.is_running: return
+            self.record_path = os.path.join("assets", "sessions", time.strftime("session_%Y%m%d_%H%M%S.pkl"))
+            self.camera_engine.start_recording()
+        else:
+            self.camera_engine.stop_recording(self.record_path)
+            self.record_path = None
 
     def stop_process(self):
         print(">> System Stopped.")
+        if self.record_path:
+            self.toggle_recording()
+        self.cancel_frame_poll()
         self.camera_engine.stop_camera()
         self.camera_label.configure(image=None) 
         self.camera_label.image = None
         self.sidebar.show_menu()
         self.btn_stop.place_forget()
+        self.hud_label.place_forget()
         self.status_label.configure(text="WHAT DO YOU THINK?\nSYSTEM IDLE.")
         self.status_label.place(relx=0.5, rely=0.5, anchor="center")
 
-    def update_camera_loop(self):
-        if self.camera_engine.is_running:
-            frame = self.camera_engine.latest_frame
-            
-            if frame is not None:
-                win_w = self.main_area.winfo_width()
-                win_h = self.main_area.winfo_height()
+    def notify_new_frame(self):
+        # Called from the camera thread: never blocks on Tk, repeated frames coalesce
+        self.frame_ready.set()
+
+    def poll_new_frame(self):
+        self.frame_poll_job = None
+        if not self.camera_engine.is_running:
+            return
+
+        self.stats_wakeups += 1
+        if self.frame_ready.is_set():
+            self.frame_ready.clear()
+            self.on_new_frame()
+
+        self.frame_poll_job = self.after(self.next_poll_delay(), self.poll_new_frame)
 
-                if win_w > 10 and win_h > 10:
-                    resized_frame = self.resize_with_aspect_ratio(
-                        frame, win_w, win_h
-                    )
+    def next_poll_delay(self):
+        # Sleep until the producer's next frame is due; poll tightly only once it is due or late
+        if self.last_frame_time is None:
+            return FRAME_RETRY_MS
+        due = self.last_frame_time + self.frame_period - time.perf_counter()
+        return max(int(due * 1000), FRAME_RETRY_MS)
 
-                    ctk_img = ctk.CTkImage(
-                        light_image=resized_frame,
-                        dark_image=resized_frame,
-                        size=resized_frame.size
-                    )
+    def cancel_frame_poll(self):
+        if self.frame_poll_job is not None:
+            self.after_cancel(self.frame_poll_job)
+            self.frame_poll_job = None
 
-                    self.camera_label.configure(image=ctk_img)
-                    self.camera_label.image = ctk_img 
+    def on_new_frame(self):
+        frame_id, frame, frame_time = self.camera_engine.get_latest_frame()
 
-                    if self.status_label.winfo_ismapped():
-                        self.status_label.place_forget()
+        if frame is None or frame_id == self.last_rendered_id:
+            return
 
-            self.after(1000 // 30, self.update_camera_loop)
+        win_w, win_h = self.display_size
+        if win_w <= 10 or win_h <= 10:
+            return
+
+        # Frames produced while the UI was busy are skipped, not queued
+        if self.last_rendered_id:
+            self.stats_dropped += frame_id - self.last_rendered_id - 1
+            # Smoothed producer period, used to schedule the next wake-up
+            if frame_id > self.last_rendered_id and frame_time > self.last_frame_time:
+                period = (frame_time - self.last_frame_time) / (frame_id - self.last_rendered_id)
+                self.frame_period += 0.1 * (period - self.frame_period)
+        self.last_rendered_id = frame_id
+        self.last_frame_time = frame_time
+
+        resized_frame = self.resize_with_aspect_ratio(frame, win_w, win_h)
+
+        ctk_img = ctk.CTkImage(
+            light_image=resized_frame,
+            dark_image=resized_frame,
+            size=resized_frame.size
+        )
+
+        self.camera_label.configure(image=ctk_img)
+        self.camera_label.image = ctk_img
+
+        if self.status_label.winfo_ismapped():
+            self.status_label.place_forget()
+
+        self.stats_rendered += 1
+        self.stats_latency += time.perf_counter() - frame_time
+        self.update_hud()
+
+    def on_close(self):
+        # Release camera, worker processes and shared memory before the window goes away
+        if self.record_path:
+            self.toggle_recording()
+        self.cancel_frame_poll()
+        self.camera_engine.stop_camera()
+        self.destroy()
+
+    def update_hud(self):
+        elapsed = time.perf_counter() - self.stats_window_start
+        if elapsed < 1.0:
+            return
+
+        n = max(self.stats_rendered, 1)
+        cpu = time.thread_time() - self.stats_cpu_start
+        self.hud_label.configure(
+            text=(("REC | " if self.record_path else "") +
+                  f"UI {self.stats_rendered / elapsed:.1f} FPS | "
+                  f"LAT {self.stats_latency / n * 1000:.1f} ms | "
+                  f"CPU {cpu / n * 1000:.1f} ms | "
+                  f"WAKE {self.stats_wakeups / elapsed:.0f}/s | "
+                  f"DROP {self.stats_dropped}")
+        )
+        if not self.hud_label.winfo_ismapped():
+            self.hud_label.place(relx=0.01, rely=0.01, anchor="nw")
+        self.hud_label.lift()
+        self.reset_display_stats()
 
 if __name__ == "__main__":
-    app = SmartVisionApp()
+    parser = argparse.ArgumentParser(description="Smart Vision Desktop")
+    parser.add_argument("--workers", type=int, default=0,
+                        help="Jumlah proses recognition (0 = recognition di thread kamera)")
+    args = parser.parse_args()
+
+    app = SmartVisionApp(num_workers=args.workers)
     app.mainloop()
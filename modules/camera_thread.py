@@ -5,64 +5,130 @@ import dlib
 import os
 import numpy as np
 from PIL import Image
+from modules.shared_engine import RecognitionPool
+from modules.session_recorder import SessionRecorder
+from modules.face_engine import RECOG_ACCEPT
 
 class CameraThread:
-    def __init__(self, video_source=0):
+    def __init__(self, video_source=0, on_new_frame=None, num_workers=0, load_models=True):
         self.video_source = video_source
         self.is_running = False
         self.thread = None
         self.latest_frame = None
 
-        print(">> [AI-ENGINE] Memuat Model Dlib...")
-        self.detector = dlib.get_frontal_face_detector()
+        # Frame publishing: producer only keeps the newest frame, consumer is notified
+        self.on_new_frame = on_new_frame
+        self.frame_lock = threading.Lock()
+        self.frame_id = 0
+        self.frame_timestamp = 0.0
 
         path_landmarks = "resources/shape_predictor_68_face_landmarks.dat"
         path_resnet = "resources/dlib_face_recognition_resnet_model_v1.dat"
+        self.model_paths = (path_landmarks, path_resnet)
 
+        self.detector = None
         self.predictor = None
         self.face_rec_model = None
 
-        if os.path.exists(path_landmarks) and os.path.exists(path_resnet):
+        if load_models:
+            print(">> [AI-ENGINE] Memuat Model Dlib...")
+            self.detector = dlib.get_frontal_face_detector()
+
+        if load_models and os.path.exists(path_landmarks) and os.path.exists(path_resnet):
             self.predictor = dlib.shape_predictor(path_landmarks)
             self.face_rec_model = dlib.face_recognition_model_v1(path_resnet)
             print(">> [AI-ENGINE] Model AI SIAP!")
 
         self.face_database = [] 
+        self.accept_thresholds = {}
+
+        # Multi-process recognition (0 = run recognition in this thread)
+        self.num_workers = num_workers
+        self.gallery_dirty = True
         
         # Multi-face slots initialization
         self.face_slots = [
             {
                 "id": 0, "active": False, "rect": None, "landmarks": None,
                 "state": "IDLE", "confidence": 0.0, "name": "UNKNOWN",
-                "color": (255, 0, 0), "lost_counter": 0, "miss_counter": 0
+                "color": (255, 0, 0), "lost_counter": 0, "miss_counter": 0,
+                "acquired_frame": 0
             },
             {
                 "id": 1, "active": False, "rect": None, "landmarks": None,
                 "state": "IDLE", "confidence": 0.0, "name": "UNKNOWN",
-                "color": (0, 255, 255), "lost_counter": 0, "miss_counter": 0
+                "color": (0, 255, 255), "lost_counter": 0, "miss_counter": 0,
+                "acquired_frame": 0
             }
         ]
         
         # Configuration
         self.MAX_LOST_FRAMES = 5
         self.CONFIDENCE_THRESHOLD = 3.0
-        self.RECOG_ACCEPT = 0.50 
+        self.RECOG_ACCEPT = RECOG_ACCEPT
         self.RECOG_GRAY = 0.60    
+        self.DETECT_INTERVAL = 4
+        self.REC_INTERVAL_SEARCHING = 6
+        self.REC_INTERVAL_CONFIRMED = 15
         self.frame_count = 0
 
-    def update_database(self, new_database):
+        # Session recording (see modules/session_recorder.py)
+        self.recorder = None
+
+    def update_database(self, new_database, accept_thresholds=None):
         self.face_database = new_database
+        self.accept_thresholds = accept_thresholds or {}
+        self.gallery_dirty = True
         print(f">> [CAMERA] Database diperbarui! Total wajah: {len(self.face_database)}")
 
     def start_camera(self):
-        if not self.is_running:
-            self.is_running = True
-            self.thread = threading.Thread(target=self._capture_loop, daemon=True)
-            self.thread.start()
+        if self.is_running:
+            return True
+
+        # Never run two capture threads: the previous one may still be stopping its workers
+        if self.thread and self.thread.is_alive():
+            self.thread.join(timeout=5.0)
+            if self.thread.is_alive():
+                print(">> [CAMERA] Thread kamera sebelumnya belum berhenti, start dibatalkan.")
+                return False
+
+        self.is_running = True
+        self.thread = threading.Thread(target=self._capture_loop, daemon=True)
+        self.thread.start()
+        return True
 
     def stop_camera(self):
         self.is_running = False
 
+        # Wait for the capture thread so worker processes & shared memory are released
+        if self.thread and self.thread is not threading.current_thread():
+            self.thread.join(timeout=5.0)
+
+    def start_recording(self, store_frames=True):
+        self.recorder = SessionRecorder(self, store_frames=store_frames)
+        print(">> [REC] Perekaman sesi dimulai.")
+
+    def stop_recording(self, path):
+        recorder = self.recorder
+        self.recorder = None
+        if recorder is None:
+            return False
+        return recorder.save(path)
+
+    def get_latest_frame(self):
+        # Return (frame_id, frame, timestamp) as one consistent snapshot
+        with self.frame_lock:
+            return self.frame_id, self.latest_frame, self.frame_timestamp
+
+    def _publish_frame(self, image):
+        with self.frame_lock:
+            self.latest_frame = image
+            self.frame_id += 1
+            self.frame_timestamp = time.perf_counter()
+
+        if self.on_new_frame:
+            self.on_new_frame()
+
     def calculate_center(self, rect):
         return (rect.left() + rect.right()) // 2, (rect.top() + rect.bottom()) // 2
 
@@ -90,6 +156,7 @@ class CameraThread:
             # State Transitions
             if slot["state"] == "IDLE":
                 slot["state"] = "SEARCHING"
+                slot["acquired_frame"] = self.frame_count
                 
             elif slot["state"] == "LOST":
                 if slot["confidence"] >= self.CONFIDENCE_THRESHOLD:
@@ -132,6 +199,49 @@ class CameraThread:
                     slot["name"] = "UNKNOWN"
                     slot["rect"] = None
 
+    def _apply_match(self, slot, best_match_dist, best_match_name):
+        # Hysteresis Logic (per-identity accept threshold from gallery audit)
+        accept = self.accept_thresholds.get(best_match_name, self.RECOG_ACCEPT)
+        if best_match_dist < accept:
+            if slot["state"] == "CONFIRMED" and slot["name"] == best_match_name:
+                slot["confidence"] = min(slot["confidence"] + 1.0, 5.0)
+            else:
+                slot["name"] = best_match_name
+                slot["confidence"] = min(slot["confidence"] + 1.5, 5.0)
+
+        elif best_match_dist < self.RECOG_GRAY:
+            slot["confidence"] -= 0.1
+
+        else:
+            if slot["state"] == "CONFIRMED":
+                slot["confidence"] -= 0.5 
+                if slot["confidence"] <= 0: slot["name"] = "UNKNOWN"
+            else:
+                slot["confidence"] = max(slot["confidence"] - 2.0, 0.0)
+                slot["name"] = "UNKNOWN"
+
+    def _sync_worker_pool(self, pool, frame_shape):
+        # Worker processes start on the first frame (frame size known)
+        if not pool.started:
+            pool.start(frame_shape)
+
+        if self.gallery_dirty or pool.gallery is None:
+            self.gallery_dirty = False
+            pool.update_gallery(self.face_database)
+
+        recorder = self.recorder
+        for frame_idx, slot_id, rect, descriptor, name, dist in pool.poll():
+            # Keyed by the frame the request came from, like _describe in single-process mode
+            if recorder:
+                recorder.on_describe(frame_idx, dlib.rectangle(*rect), descriptor)
+
+            slot = self.face_slots[slot_id]
+
+            # Result belongs to an earlier face that used this slot, or to an old gallery
+            if frame_idx < slot["acquired_frame"] or name is None: continue
+            if slot["active"] and slot["state"] != "LOST":
+                self._apply_match(slot, dist, name)
+
     def _capture_loop(self):
         cap = cv2.VideoCapture(self.video_source, cv2.CAP_DSHOW)
         cap.set(cv2.CAP_PROP_FRAME_WIDTH, 1280)
@@ -139,152 +249,193 @@ class CameraThread:
         
         print(">> [INFO] SmartVision Pro Logic Running")
 
+        # The pool belongs to this thread only, so a later thread can never touch it
+        pool = None
+        if self.num_workers > 0 and self.face_rec_model is not None:
+            pool = RecognitionPool(self.num_workers, self.model_paths)
+
+        try:
+            self._process_loop(cap, pool)
+        finally:
+            if pool:
+                pool.stop()
+            cap.release()
+
+    def _process_loop(self, cap, pool):
         TARGET_FPS = 25
         FRAME_TIME = 1 / TARGET_FPS
-        DETECT_INTERVAL = 4 
 
         while self.is_running:
             start_time = time.time()
             ret, frame = cap.read()
             if not ret: continue
 
-            h, w, _ = frame.shape
             small_frame = cv2.resize(frame, (0, 0), fx=0.5, fy=0.5)
             rgb_small = cv2.cvtColor(small_frame, cv2.COLOR_BGR2RGB)
             rgb_small = np.ascontiguousarray(rgb_small, dtype=np.uint8)
 
-            detected_faces = []
-            detection_ran = False 
-
-            # --- Detection Phase ---
-            if self.frame_count % DETECT_INTERVAL == 0:
-                detection_ran = True 
-                raw_faces = self.detector(rgb_small, 0)
-                sorted_faces = sorted(raw_faces, key=lambda f: f.area(), reverse=True)
-                detected_faces = sorted_faces[:2]
+            recorder = self.recorder
+            if recorder:
+                recorder.on_frame(self.frame_count, start_time, rgb_small, self.face_slots)
 
-            # --- Slot Assignment Logic ---
-            if detection_ran:
-                slot_matches = [False, False] 
+            self.process_frame(rgb_small, pool)
+            self._draw_slots(frame)
 
-                if len(detected_faces) > 0:
-                    for face in detected_faces:
-                        cx, cy = self.calculate_center(face)
-                        best_slot_idx = -1
-                        min_dist = 10000
+            self.frame_count += 1
+            frame_rgb = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
+            self._publish_frame(Image.fromarray(frame_rgb))
 
-                        # Find closest active slot
+            elapsed = time.time() - start_time
+            if elapsed < FRAME_TIME:
+                time.sleep(FRAME_TIME - elapsed)
+
+    def _detect(self, rgb_small):
+        faces = list(self.detector(rgb_small, 0))
+
+        recorder = self.recorder
+        if recorder:
+            recorder.on_detect(self.frame_count, faces)
+        return faces
+
+    def _describe(self, rgb_small, slot):
+        if self.predictor is None or self.face_rec_model is None:
+            return None
+
+        slot["landmarks"] = self.predictor(rgb_small, slot["rect"])
+        descriptor = np.array(self.face_rec_model.compute_face_descriptor(rgb_small, slot["landmarks"]))
+
+        recorder = self.recorder
+        if recorder:
+            recorder.on_describe(self.frame_count, slot["rect"], descriptor)
+        return descriptor
+
+    def process_frame(self, rgb_small, pool=None):
+        """
+        Satu langkah state machine: Detection -> Slot Assignment -> Recognition.
+        Dipakai oleh loop kamera dan oleh replay sesi.
+        """
+        worker_requests = []
+        if pool:
+            self._sync_worker_pool(pool, rgb_small.shape)
+
+        detected_faces = []
+        detection_ran = False 
+
+        # --- Detection Phase ---
+        if self.frame_count % self.DETECT_INTERVAL == 0:
+            detection_ran = True 
+            raw_faces = self._detect(rgb_small)
+            sorted_faces = sorted(raw_faces, key=lambda f: f.area(), reverse=True)
+            detected_faces = sorted_faces[:2]
+
+        # --- Slot Assignment Logic ---
+        if detection_ran:
+            slot_matches = [False, False] 
+
+            if len(detected_faces) > 0:
+                for face in detected_faces:
+                    cx, cy = self.calculate_center(face)
+                    best_slot_idx = -1
+                    min_dist = 10000
+
+                    # Find closest active slot
+                    for i, slot in enumerate(self.face_slots):
+                        if slot["active"] and slot["rect"]:
+                            scx, scy = self.calculate_center(slot["rect"])
+                            dist = self.calculate_distance((cx, cy), (scx, scy))
+                            
+                            threshold = 150 
+                            if slot["state"] == "LOST": threshold = 80 
+
+                            if dist < threshold and dist < min_dist:
+                                min_dist = dist
+                                best_slot_idx = i
+
+                    # If no match, find empty slot
+                    if best_slot_idx == -1:
                         for i, slot in enumerate(self.face_slots):
-                            if slot["active"] and slot["rect"]:
-                                scx, scy = self.calculate_center(slot["rect"])
-                                dist = self.calculate_distance((cx, cy), (scx, scy))
-                                
-                                threshold = 150 
-                                if slot["state"] == "LOST": threshold = 80 
-
-                                if dist < threshold and dist < min_dist:
-                                    min_dist = dist
-                                    best_slot_idx = i
-
-                        # If no match, find empty slot
-                        if best_slot_idx == -1:
-                            for i, slot in enumerate(self.face_slots):
-                                if not slot["active"] and slot["state"] == "IDLE":
-                                    best_slot_idx = i
-                                    break
-                        
-                        # Assign and Smooth
-                        if best_slot_idx != -1 and not slot_matches[best_slot_idx]:
-                            old_rect = self.face_slots[best_slot_idx]["rect"]
-                            self.face_slots[best_slot_idx]["rect"] = self.smooth_rect(old_rect, face)
-                            slot_matches[best_slot_idx] = True
-
-                for i, slot in enumerate(self.face_slots):
-                    matched = slot_matches[i]
-                    self._update_slot_state(slot, matched)
+                            if not slot["active"] and slot["state"] == "IDLE":
+                                best_slot_idx = i
+                                break
+                    
+                    # Assign and Smooth
+                    if best_slot_idx != -1 and not slot_matches[best_slot_idx]:
+                        old_rect = self.face_slots[best_slot_idx]["rect"]
+                        self.face_slots[best_slot_idx]["rect"] = self.smooth_rect(old_rect, face)
+                        slot_matches[best_slot_idx] = True
 
-            else:
-                # Keep alive during non-detection frames
-                for slot in self.face_slots:
-                    if slot["active"] and slot["state"] != "LOST":
-                        slot["lost_counter"] = 0
-            
-            # --- Recognition Phase ---
+            for i, slot in enumerate(self.face_slots):
+                matched = slot_matches[i]
+                self._update_slot_state(slot, matched)
+
+        else:
+            # Keep alive during non-detection frames
             for slot in self.face_slots:
-                if slot["active"] and slot["rect"] and slot["state"] != "LOST":
+                if slot["active"] and slot["state"] != "LOST":
+                    slot["lost_counter"] = 0
+        
+        # --- Recognition Phase ---
+        for slot in self.face_slots:
+            if slot["active"] and slot["rect"] and slot["state"] != "LOST":
+                
+                rec_check_interval = (self.REC_INTERVAL_SEARCHING if slot["state"] == "SEARCHING"
+                                      else self.REC_INTERVAL_CONFIRMED)
+
+                if pool:
+                    # Landmarks, descriptor & matching run in a worker; result applied on a later frame
+                    if len(self.face_database) > 0 and self.frame_count % rec_check_interval == 0:
+                        rect = slot["rect"]
+                        worker_requests.append((slot["id"], (rect.left(), rect.top(), rect.right(), rect.bottom())))
+                    elif slot["confidence"] > 0:
+                        slot["confidence"] -= 0.01 if slot["state"] == "CONFIRMED" else 0.2
+                    continue
+
+                current_desc = None
+                if len(self.face_database) > 0 and self.frame_count % rec_check_interval == 0:
+                    current_desc = self._describe(rgb_small, slot)
+
+                if current_desc is not None:
+                    best_match_dist = 1.0 
+                    best_match_name = "UNKNOWN"
                     
-                    slot["landmarks"] = self.predictor(rgb_small, slot["rect"])
-                    rec_check_interval = 6 if slot["state"] == "SEARCHING" else 15
-                    did_recognition = False 
-
-                    if (self.face_rec_model and len(self.face_database) > 0 and 
-                        slot["landmarks"] and self.frame_count % rec_check_interval == 0):
-                        
-                        did_recognition = True
-                        current_desc = np.array(self.face_rec_model.compute_face_descriptor(rgb_small, slot["landmarks"]))
-                        
-                        best_match_dist = 1.0 
-                        best_match_name = "UNKNOWN"
-                        
-                        for data in self.face_database:
-                            dist = np.linalg.norm(data["encoding"] - current_desc)
-                            if dist < best_match_dist:
-                                best_match_dist = dist
-                                best_match_name = data["name"]
-                        
-                        # Hysteresis Logic
-                        if best_match_dist < self.RECOG_ACCEPT:
-                            if slot["state"] == "CONFIRMED" and slot["name"] == best_match_name:
-                                slot["confidence"] = min(slot["confidence"] + 1.0, 5.0)
-                            else:
-                                slot["name"] = best_match_name
-                                slot["confidence"] = min(slot["confidence"] + 1.5, 5.0)
-
-                        elif best_match_dist < self.RECOG_GRAY:
-                            slot["confidence"] -= 0.1
-
-                        else:
-                            if slot["state"] == "CONFIRMED":
-                                slot["confidence"] -= 0.5 
-                                if slot["confidence"] <= 0: slot["name"] = "UNKNOWN"
-                            else:
-                                slot["confidence"] = max(slot["confidence"] - 2.0, 0.0)
-                                slot["name"] = "UNKNOWN"
-
-                    # Confidence Decay
-                    elif not did_recognition and slot["confidence"] > 0:
-                        if slot["state"] == "CONFIRMED":
-                            slot["confidence"] -= 0.01 
-                        else:
-                            slot["confidence"] -= 0.2 
-
-            # --- Visualization ---
-            for slot in self.face_slots:
-                if slot["active"] and slot["rect"]:
-                    rect = slot["rect"]
-                    x1, y1 = int(rect.left() * 2), int(rect.top() * 2)
-                    x2, y2 = int(rect.right() * 2), int(rect.bottom() * 2)
-
-                    color = slot["color"]
-                    display_name = slot['name']
+                    for data in self.face_database:
+                        dist = np.linalg.norm(data["encoding"] - current_desc)
+                        if dist < best_match_dist:
+                            best_match_dist = dist
+                            best_match_name = data["name"]
                     
-                    if slot["state"] == "LOST":
-                         display_name = "LOST..."
-                         color = (0, 0, 150)
-                         cv2.rectangle(frame, (x1, y1), (x2, y2), color, 1) 
+                    self._apply_match(slot, best_match_dist, best_match_name)
+
+                # Confidence Decay
+                elif slot["confidence"] > 0:
+                    if slot["state"] == "CONFIRMED":
+                        slot["confidence"] -= 0.01 
                     else:
-                         if slot["state"] == "CONFIRMED": color = (0, 255, 0) 
-                         elif slot["state"] == "SEARCHING": color = (0, 255, 255) 
-                         cv2.rectangle(frame, (x1, y1), (x2, y2), color, 2)
+                        slot["confidence"] -= 0.2 
 
-                    status_text = f"S{slot['id']} {display_name} {slot['confidence']:.1f}"
-                    cv2.putText(frame, status_text, (x1, y1 - 10), 
-                               cv2.FONT_HERSHEY_SIMPLEX, 0.6, color, 2)
+        if worker_requests:
+            pool.submit(self.frame_count, rgb_small, worker_requests)
 
-            self.frame_count += 1
-            frame_rgb = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
-            self.latest_frame = Image.fromarray(frame_rgb)
+    def _draw_slots(self, frame):
+        # --- Visualization ---
+        for slot in self.face_slots:
+            if slot["active"] and slot["rect"]:
+                rect = slot["rect"]
+                x1, y1 = int(rect.left() * 2), int(rect.top() * 2)
+                x2, y2 = int(rect.right() * 2), int(rect.bottom() * 2)
 
-            elapsed = time.time() - start_time
-            if elapsed < FRAME_TIME:
-                time.sleep(FRAME_TIME - elapsed)
\ No newline at end of file
+                color = slot["color"]
+                display_name = slot['name']
+                
+                if slot["state"] == "LOST":
+                     display_name = "LOST..."
+                     color = (0, 0, 150)
+                     cv2.rectangle(frame, (x1, y1), (x2, y2), color, 1) 
+                else:
+                     if slot["state"] == "CONFIRMED": color = (0, 255, 0) 
+                     elif slot["state"] == "SEARCHING": color = (0, 255, 255) 
+                     cv2.rectangle(frame, (x1, y1), (x2, y2), color, 2)
+
+                status_text = f"S{slot['id']} {display_name} {slot['confidence']:.1f}"
+                cv2.putText(frame, status_text, (x1, y1 - 10), 
+                           cv2.FONT_HERSHEY_SIMPLEX, 0.6, color, 2)
@@ -3,11 +3,16 @@ import pickle
 import dlib
 import cv2
 import numpy as np
+from modules.face_engine import GalleryIndex, RECOG_ACCEPT
 
 class DataManager:
     def __init__(self):
         self.db_folder = "assets/database"
         self.db_file = os.path.join(self.db_folder, "face_cache.pkl")
+        self.index_file = os.path.join(self.db_folder, "gallery_index.pkl")
+
+        # Same accept threshold as CameraThread: embeddings closer than this collide
+        self.RECOG_ACCEPT = RECOG_ACCEPT
         
         self.model_shape = "resources/shape_predictor_68_face_landmarks.dat"
         self.model_resnet = "resources/dlib_face_recognition_resnet_model_v1.dat"
@@ -97,6 +102,13 @@ class DataManager:
                 if user['name'].upper() == name.upper():
                     return False, f"Nama '{name}' sudah ada di database!"
 
+            # Impostor / duplicate-person check against the gallery index
+            index = self.load_index(current_db)
+            nearest, dist = index.query(encoding)
+            if dist < self.RECOG_ACCEPT:
+                return False, (f"Wajah terlalu mirip dengan '{index.names[nearest]}' "
+                               f"(jarak {dist:.2f})! Kemungkinan orang yang sama.")
+
             new_data = {
                 "name": name.upper(),
                 "encoding": encoding
@@ -105,6 +117,8 @@ class DataManager:
             current_db.append(new_data)
             
             if self.save_database(current_db):
+                index.add(new_data["name"], encoding)
+                index.save(self.index_file)
                 return True, f"Berhasil mendaftarkan: {name}"
             else:
                 return False, "Gagal menulis ke file database."
@@ -124,6 +138,9 @@ class DataManager:
             return False, "Nama tidak ditemukan di database."
         
         if self.save_database(filtered_db):
+            index = self.load_index(current_db)
+            index.remove(name)
+            index.save(self.index_file)
             return True, f"Wajah '{name}' berhasil dihapus."
         else:
             return False, "Gagal update file database."
@@ -134,3 +151,31 @@ class DataManager:
         """
         db = self.load_database()
         return sorted([u['name'] for u in db])
+
+    def load_index(self, database=None):
+        """
+        Memuat gallery index (NN graph) yang sinkron dengan database
+        """
+        if database is None:
+            database = self.load_database()
+        return GalleryIndex().load(self.index_file, database)
+
+    def audit_gallery(self):
+        """
+        Audit seluruh gallery: konflik antar identitas + margin per identitas
+        Return: (conflicts, report)
+        """
+        index = self.load_index()
+        conflicts = index.conflicts(self.RECOG_ACCEPT)
+        report = index.report(self.RECOG_ACCEPT)
+
+        print(f">> [AUDIT] {len(index)} wajah, {len(conflicts)} konflik.")
+        for name_a, name_b, dist in conflicts:
+            print(f">> [AUDIT] KONFLIK: {name_a} <-> {name_b} (jarak {dist:.3f})")
+        return conflicts, report
+
+    def get_accept_thresholds(self, database=None):
+        """
+        Threshold accept per identitas berdasarkan margin di gallery
+        """
+        return self.load_index(database).accept_thresholds(self.RECOG_ACCEPT)
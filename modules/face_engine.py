@@ -0,0 +1,221 @@
+import os
+import pickle
+import numpy as np
+
+# Match distance below which a face is accepted (shared by engine & data manager)
+RECOG_ACCEPT = 0.50
+# Lowest per-identity accept threshold for conflicting identities; below this
+# genuine webcam matches would fall into the gray zone and never confirm
+RECOG_ACCEPT_FLOOR = 0.40
+
+class GalleryIndex:
+    """
+    Nearest-neighbour index untuk seluruh gallery wajah.
+    Semua jarak dihitung per blok (block_size x block_size) supaya memori
+    tetap terbatas walaupun gallery berisi 100k identitas.
+    """
+    def __init__(self, block_size=2048):
+        self.block_size = block_size
+        self.names = []
+        self.matrix = np.zeros((0, 128), dtype=np.float32)
+        self.sq_norms = np.zeros(0, dtype=np.float32)
+        self.nn_index = np.zeros(0, dtype=np.int64)
+        self.nn_dist = np.zeros(0, dtype=np.float32)
+
+    def __len__(self):
+        return len(self.names)
+
+    def build(self, database):
+        self.names = [data["name"] for data in database]
+        encodings = [np.asarray(data["encoding"], dtype=np.float32) for data in database]
+        self.matrix = np.asarray(encodings, dtype=np.float32).reshape(-1, 128)
+        self.sq_norms = np.einsum("ij,ij->i", self.matrix, self.matrix)
+        self.nn_index, self.nn_dist = self._nearest(np.arange(len(self.names)))
+        print(f">> [INDEX] Gallery index dibangun: {len(self.names)} wajah.")
+
+    def _block_distances(self, queries, q_norms, start, stop):
+        # ||a - b||^2 = ||a||^2 + ||b||^2 - 2ab, computed for one column block
+        cols = self.matrix[start:stop]
+        d2 = q_norms[:, None] + self.sq_norms[None, start:stop] - 2.0 * (queries @ cols.T)
+        np.maximum(d2, 0.0, out=d2)
+        return d2
+
+    def _nearest(self, rows):
+        n = len(self.names)
+        best_idx = np.full(len(rows), -1, dtype=np.int64)
+        best_d2 = np.full(len(rows), np.inf, dtype=np.float32)
+
+        for r0 in range(0, len(rows), self.block_size):
+            row_ids = rows[r0:r0 + self.block_size]
+            queries = self.matrix[row_ids]
+            q_norms = self.sq_norms[row_ids]
+            blk_idx = best_idx[r0:r0 + self.block_size]
+            blk_d2 = best_d2[r0:r0 + self.block_size]
+
+            for c0 in range(0, n, self.block_size):
+                c1 = min(c0 + self.block_size, n)
+                d2 = self._block_distances(queries, q_norms, c0, c1)
+
+                # Exclude self-matches, only for rows whose own column is in this block
+                self_rows = np.flatnonzero((row_ids >= c0) & (row_ids < c1))
+                if len(self_rows) > 0:
+                    d2[self_rows, row_ids[self_rows] - c0] = np.inf
+
+                local = np.argmin(d2, axis=1)
+                local_d2 = d2[np.arange(len(row_ids)), local]
+                better = local_d2 < blk_d2
+                blk_idx[better] = local[better] + c0
+                blk_d2[better] = local_d2[better]
+
+        return best_idx, np.sqrt(best_d2)
+
+    def query(self, encoding):
+        """
+        Cari tetangga terdekat untuk satu encoding baru.
+        Return: (index, jarak) atau (-1, inf) jika gallery kosong
+        """
+        return self._query_all(encoding)[:2]
+
+    def _query_all(self, encoding):
+        n = len(self.names)
+        if n == 0:
+            return -1, np.inf, np.zeros(0, dtype=np.float32)
+
+        q = np.asarray(encoding, dtype=np.float32).reshape(1, -1)
+        q_norm = np.einsum("ij,ij->i", q, q)
+        dists = np.empty(n, dtype=np.float32)
+
+        for c0 in range(0, n, self.block_size):
+            c1 = min(c0 + self.block_size, n)
+            dists[c0:c1] = np.sqrt(self._block_distances(q, q_norm, c0, c1)[0])
+
+        best = int(np.argmin(dists))
+        return best, float(dists[best]), dists
+
+    def add(self, name, encoding):
+        best, best_dist, dists = self._query_all(encoding)
+
+        # Existing identities whose nearest neighbour is now the new face
+        new_id = len(self.names)
+        closer = dists < self.nn_dist
+        self.nn_index[closer] = new_id
+        self.nn_dist[closer] = dists[closer]
+
+        vec = np.asarray(encoding, dtype=np.float32).reshape(1, 128)
+        self.names.append(name)
+        self.matrix = np.vstack([self.matrix, vec])
+        self.sq_norms = np.append(self.sq_norms, np.einsum("ij,ij->i", vec, vec))
+        self.nn_index = np.append(self.nn_index, best)
+        self.nn_dist = np.append(self.nn_dist, np.float32(best_dist))
+
+    def remove(self, name):
+        keep = np.array([n != name for n in self.names], dtype=bool)
+        if keep.all():
+            return False
+
+        # Remap neighbour ids to the compacted positions (-1 = no neighbour)
+        new_pos = np.cumsum(keep) - 1
+        has_nn = self.nn_index >= 0
+        orphaned = has_nn & ~keep[np.where(has_nn, self.nn_index, 0)]
+        kept_nn = self.nn_index[keep]
+
+        self.names = [n for n, k in zip(self.names, keep) if k]
+        self.matrix = self.matrix[keep]
+        self.sq_norms = self.sq_norms[keep]
+        self.nn_index = np.where(kept_nn >= 0, new_pos[np.maximum(kept_nn, 0)], -1)
+        self.nn_dist = self.nn_dist[keep]
+
+        # Rows that pointed at the removed face need a fresh search
+        stale = np.flatnonzero(orphaned[keep])
+        if len(stale) > 0:
+            idx, dist = self._nearest(stale)
+            self.nn_index[stale] = idx
+            self.nn_dist[stale] = dist
+        return True
+
+    def conflicts(self, threshold):
+        """
+        Pasangan identitas yang jarak nearest-neighbour-nya di bawah threshold.
+        Return: List of tuple (nama_a, nama_b, jarak)
+        """
+        seen = set()
+        result = []
+        for i in np.flatnonzero(self.nn_dist < threshold):
+            j = int(self.nn_index[i])
+            key = (min(i, j), max(i, j))
+            if key in seen: continue
+            seen.add(key)
+            result.append((self.names[key[0]], self.names[key[1]], float(self.nn_dist[i])))
+        return sorted(result, key=lambda c: c[2])
+
+    def report(self, accept):
+        """
+        Margin per identitas: jarak ke tetangga terdekat dikurangi threshold accept.
+        Margin negatif = identitas bisa tertukar (flapping).
+        """
+        rows = []
+        for i, name in enumerate(self.names):
+            j = int(self.nn_index[i])
+            dist = float(self.nn_dist[i])
+            rows.append({
+                "name": name,
+                "nearest": self.names[j] if j >= 0 else None,
+                "distance": dist,
+                "margin": dist - accept
+            })
+        return sorted(rows, key=lambda r: r["margin"])
+
+    def accept_thresholds(self, accept, floor=RECOG_ACCEPT_FLOOR):
+        """
+        Threshold accept per identitas. Identitas dengan margin negatif
+        (tetangga terdekat < accept) diperketat sebesar margin-nya, yaitu
+        accept + margin = jarak ke tetangga terdekat, dan tidak di bawah floor.
+        Contoh (accept 0.50, floor 0.40): tetangga 0.46 -> 0.46, tetangga 0.30 -> 0.40.
+        Return: dict {nama: threshold} hanya untuk identitas yang diperketat
+        """
+        thresholds = {}
+        for name, dist in zip(self.names, self.nn_dist):
+            dist = float(dist)
+            if dist >= accept: continue
+            # A match must be closer than the nearest other gallery face is
+            limit = max(floor, dist)
+            thresholds[name] = min(thresholds.get(name, accept), limit)
+        return thresholds
+
+    def save(self, path):
+        try:
+            with open(path, "wb") as f:
+                pickle.dump({
+                    "names": self.names,
+                    "nn_index": self.nn_index,
+                    "nn_dist": self.nn_dist
+                }, f)
+            return True
+        except Exception as e:
+            print(f">> [ERROR] Gagal menyimpan gallery index: {e}")
+            return False
+
+    def load(self, path, database):
+        """
+        Memuat NN graph dari file. Jika tidak sinkron dengan database, index dibangun ulang.
+        """
+        names = [data["name"] for data in database]
+        encodings = [np.asarray(data["encoding"], dtype=np.float32) for data in database]
+
+        if os.path.exists(path):
+            try:
+                with open(path, "rb") as f:
+                    saved = pickle.load(f)
+                if saved["names"] == names:
+                    self.names = names
+                    self.matrix = np.asarray(encodings, dtype=np.float32).reshape(-1, 128)
+                    self.sq_norms = np.einsum("ij,ij->i", self.matrix, self.matrix)
+                    self.nn_index = saved["nn_index"]
+                    self.nn_dist = saved["nn_dist"]
+                    return self
+            except Exception as e:
+                print(f">> [ERROR] Gagal memuat gallery index: {e}")
+
+        self.build(database)
+        self.save(path)
+        return self
@@ -0,0 +1,109 @@
+import os
+import pickle
+import threading
+import cv2
+import numpy as np
+
+# Engine attributes captured with a session and accepted as replay overrides
+ENGINE_PARAMS = (
+    "MAX_LOST_FRAMES", "CONFIDENCE_THRESHOLD", "RECOG_ACCEPT", "RECOG_GRAY",
+    "DETECT_INTERVAL", "REC_INTERVAL_SEARCHING", "REC_INTERVAL_CONFIRMED"
+)
+
+
+def rect_to_tuple(rect):
+    return rect.left(), rect.top(), rect.right(), rect.bottom()
+
+
+def snapshot_slots(slots):
+    # Plain copy of the tracking state; rects as tuples, landmarks are recomputed anyway
+    snapshot = []
+    for slot in slots:
+        copy = dict(slot, landmarks=None)
+        copy["rect"] = rect_to_tuple(slot["rect"]) if slot["rect"] is not None else None
+        snapshot.append(copy)
+    return snapshot
+
+
+class SessionRecorder:
+    """
+    Merekam sesi engine: timestamp, frame kecil (JPEG, opsional),
+    hasil detector dan descriptor per frame, plus gallery & parameter engine
+    serta state slot pada frame pertama (rekaman bisa dimulai di tengah sesi).
+    Dipanggil dari thread kamera, disimpan dari thread UI (dilindungi lock).
+    """
+    def __init__(self, engine, store_frames=True, jpeg_quality=80):
+        self.store_frames = store_frames
+        self.jpeg_quality = jpeg_quality
+        self.lock = threading.Lock()
+
+        self.params = {key: getattr(engine, key) for key in ENGINE_PARAMS}
+        self.database = [{"name": d["name"], "encoding": np.asarray(d["encoding"])} for d in engine.face_database]
+        self.accept_thresholds = dict(engine.accept_thresholds)
+
+        self.slots = None
+        self.timestamps = {}
+        self.frames = {}
+        self.detections = {}
+        self.descriptors = {}
+
+    def on_frame(self, frame_no, timestamp, rgb_small, slots=None):
+        encoded = None
+        if self.store_frames:
+            bgr = cv2.cvtColor(rgb_small, cv2.COLOR_RGB2BGR)
+            ok, buf = cv2.imencode(".jpg", bgr, [cv2.IMWRITE_JPEG_QUALITY, self.jpeg_quality])
+            if ok: encoded = buf.tobytes()
+
+        with self.lock:
+            # Taken on the camera thread, before the first recorded frame is processed
+            if self.slots is None and slots is not None:
+                self.slots = snapshot_slots(slots)
+            self.timestamps[frame_no] = timestamp
+            if encoded is not None:
+                self.frames[frame_no] = encoded
+
+    def on_detect(self, frame_no, faces):
+        with self.lock:
+            self.detections[frame_no] = [rect_to_tuple(f) for f in faces]
+
+    def on_describe(self, frame_no, rect, descriptor):
+        with self.lock:
+            self.descriptors.setdefault(frame_no, []).append(
+                (rect_to_tuple(rect), np.asarray(descriptor, dtype=np.float32))
+            )
+
+    def to_session(self):
+        # Absolute frame numbers are kept so the detect/recognition cadence lines up on replay
+        with self.lock:
+            return {
+                "params": dict(self.params),
+                "database": list(self.database),
+                "accept_thresholds": dict(self.accept_thresholds),
+                "slots": [dict(slot) for slot in self.slots] if self.slots else None,
+                "timestamps": dict(self.timestamps),
+                "frames": dict(self.frames),
+                "detections": dict(self.detections),
+                "descriptors": {k: list(v) for k, v in self.descriptors.items()}
+            }
+
+    def save(self, path):
+        return save_session(self.to_session(), path)
+
+
+def save_session(session, path):
+    try:
+        folder = os.path.dirname(path)
+        if folder and not os.path.exists(folder):
+            os.makedirs(folder)
+        with open(path, "wb") as f:
+            pickle.dump(session, f)
+        print(f">> [REC] Sesi disimpan: {path} ({len(session['timestamps'])} frame)")
+        return True
+    except Exception as e:
+        print(f">> [ERROR] Gagal menyimpan sesi: {e}")
+        return False
+
+
+def load_session(path):
+    with open(path, "rb") as f:
+        return pickle.load(f)
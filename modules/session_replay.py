@@ -0,0 +1,245 @@
+import json
+import os
+import time
+import cv2
+import dlib
+import numpy as np
+from modules.camera_thread import CameraThread
+from modules.face_engine import GalleryIndex
+from modules.session_recorder import ENGINE_PARAMS, rect_to_tuple
+
+# How far back (frames) a cached stage may be reused, and how close (px) its rect must be
+LOOKBACK_FRAMES = 15
+MATCH_RADIUS = 40
+
+_models = None
+
+
+def _shared_models():
+    # Loaded once per process, only when a replay has to recompute a stage from frames
+    global _models
+    if _models is None:
+        path_landmarks = "resources/shape_predictor_68_face_landmarks.dat"
+        path_resnet = "resources/dlib_face_recognition_resnet_model_v1.dat"
+        detector = dlib.get_frontal_face_detector()
+        predictor = face_rec_model = None
+        if os.path.exists(path_landmarks) and os.path.exists(path_resnet):
+            predictor = dlib.shape_predictor(path_landmarks)
+            face_rec_model = dlib.face_recognition_model_v1(path_resnet)
+        _models = (detector, predictor, face_rec_model)
+    return _models
+
+
+class ReplayEngine(CameraThread):
+    """
+    Menjalankan ulang sesi rekaman lewat state machine CameraThread tanpa kamera.
+    Detector/descriptor diambil dari rekaman; jika tidak ada dan frame JPEG
+    tersedia, dihitung ulang dan disimpan di session["recomputed"] dengan key
+    persis (frame, rect), sehingga hasil tidak bergantung pada urutan sweep.
+    Tanpa frame, stage dari frame sebelumnya dipakai ulang (stale) dan dihitung.
+    """
+    def __init__(self, session, params=None, recompute=True):
+        super().__init__(video_source=None, load_models=False)
+        self.session = session
+        self.recompute = recompute and len(session["frames"]) > 0
+
+        for key, value in session["params"].items():
+            setattr(self, key, value)
+        for key, value in (params or {}).items():
+            if key not in ENGINE_PARAMS:
+                raise ValueError(f"Parameter tidak dikenal: {key}")
+            setattr(self, key, value)
+
+        # Resume from the slot state the recording started with (older sessions: all IDLE)
+        for slot, saved in zip(self.face_slots, session.get("slots") or []):
+            slot.update(saved)
+            if saved["rect"] is not None:
+                slot["rect"] = dlib.rectangle(*saved["rect"])
+
+        self.face_database = session["database"]
+        self.accept_thresholds = session["accept_thresholds"]
+        if params and "RECOG_ACCEPT" in params and self.face_database:
+            index = GalleryIndex()
+            index.build(self.face_database)
+            self.accept_thresholds = index.accept_thresholds(self.RECOG_ACCEPT)
+
+        self.recomputed = session.setdefault("recomputed", {"detections": {}, "descriptors": {}})
+        self.cache_hits = 0
+        self.cache_misses = 0
+        self.stale_detections = 0
+        self.stale_descriptors = 0
+        self._decoded = (None, None)
+
+    def _frame_image(self):
+        fno = self.frame_count
+        if self._decoded[0] != fno:
+            buf = np.frombuffer(self.session["frames"][fno], dtype=np.uint8)
+            rgb = cv2.cvtColor(cv2.imdecode(buf, cv2.IMREAD_COLOR), cv2.COLOR_BGR2RGB)
+            self._decoded = (fno, np.ascontiguousarray(rgb, dtype=np.uint8))
+        return self._decoded[1]
+
+    def _can_recompute(self):
+        return self.recompute and self.frame_count in self.session["frames"]
+
+    def _detect(self, rgb_small):
+        fno = self.frame_count
+        detections = self.session["detections"]
+        cached = detections.get(fno)
+        if cached is None:
+            cached = self.recomputed["detections"].get(fno)
+
+        if cached is not None:
+            self.cache_hits += 1
+        elif self._can_recompute():
+            self.cache_misses += 1
+            cached = [rect_to_tuple(f) for f in _shared_models()[0](self._frame_image(), 0)]
+            self.recomputed["detections"][fno] = cached
+        else:
+            # No frames stored: fall back to the closest earlier detection
+            self.stale_detections += 1
+            cached = []
+            for back in range(1, LOOKBACK_FRAMES + 1):
+                if fno - back in detections:
+                    cached = detections[fno - back]
+                    break
+
+        return [dlib.rectangle(*r) for r in cached]
+
+    def _cached_descriptor(self, fno, rect):
+        cx, cy = self.calculate_center(rect)
+        best, best_dist = None, MATCH_RADIUS
+        for cached_rect, descriptor in self.session["descriptors"].get(fno, []):
+            dist = self.calculate_distance((cx, cy), self.calculate_center(dlib.rectangle(*cached_rect)))
+            if dist < best_dist:
+                best, best_dist = descriptor, dist
+        return best
+
+    def _describe(self, rgb_small, slot):
+        fno = self.frame_count
+        key = (fno, rect_to_tuple(slot["rect"]))
+        descriptor = self._cached_descriptor(fno, slot["rect"])
+        if descriptor is None:
+            descriptor = self.recomputed["descriptors"].get(key)
+        if descriptor is not None:
+            self.cache_hits += 1
+            return descriptor
+
+        _, predictor, face_rec_model = _shared_models() if self._can_recompute() else (None, None, None)
+        if face_rec_model is not None:
+            self.cache_misses += 1
+            image = self._frame_image()
+            slot["landmarks"] = predictor(image, slot["rect"])
+            descriptor = np.array(face_rec_model.compute_face_descriptor(image, slot["landmarks"]), dtype=np.float32)
+            self.recomputed["descriptors"][key] = descriptor
+            return descriptor
+
+        self.stale_descriptors += 1
+        for back in range(1, LOOKBACK_FRAMES + 1):
+            descriptor = self._cached_descriptor(fno - back, slot["rect"])
+            if descriptor is not None:
+                return descriptor
+        return None
+
+    def run(self):
+        """
+        Replay seluruh sesi secepat mungkin.
+        Return: dict metrik (identity switch, time-to-confirm, CPU per frame, ...)
+        """
+        timestamps = self.session["timestamps"]
+        frames = sorted(timestamps)
+        # Tracks already running when recording began have no known start (start None)
+        tracks = [{"start": None, "confirmed": None, "name": slot["name"] if slot["name"] != "UNKNOWN" else None}
+                  if slot["active"] else None for slot in self.face_slots]
+        switches = 0
+        confirm_times = []
+        unconfirmed = 0
+        active_frames = confirmed_frames = 0
+
+        cpu_start = time.process_time()
+        wall_start = time.perf_counter()
+
+        for fno in frames:
+            t = timestamps[fno]
+            self.frame_count = fno
+            self.process_frame(None)
+
+            for i, slot in enumerate(self.face_slots):
+                track = tracks[i]
+                if track is None:
+                    if not slot["active"]: continue
+                    track = tracks[i] = {"start": t, "confirmed": None, "name": None}
+
+                # Track ended: slot went back to IDLE
+                if not slot["active"] and slot["state"] == "IDLE":
+                    if track["confirmed"] is None: unconfirmed += 1
+                    tracks[i] = None
+                    continue
+
+                active_frames += 1
+                if slot["state"] == "CONFIRMED":
+                    confirmed_frames += 1
+                    if track["confirmed"] is None:
+                        track["confirmed"] = t
+                        if track["start"] is not None:
+                            confirm_times.append(t - track["start"])
+
+                if slot["name"] != "UNKNOWN":
+                    if track["name"] is not None and slot["name"] != track["name"]:
+                        switches += 1
+                    track["name"] = slot["name"]
+
+        cpu = time.process_time() - cpu_start
+        wall = time.perf_counter() - wall_start
+        unconfirmed += sum(1 for track in tracks if track and track["confirmed"] is None)
+
+        if self.stale_detections or self.stale_descriptors:
+            print(f">> [REPLAY] PERINGATAN: {self.stale_detections} deteksi & {self.stale_descriptors} descriptor "
+                  f"memakai hasil frame sebelumnya (frame tidak direkam). Metrik bisa bias.")
+
+        n = max(len(frames), 1)
+        duration = timestamps[frames[-1]] - timestamps[frames[0]] if frames else 0.0
+        return {
+            "frames": len(frames),
+            "identity_switches": switches,
+            "tracks_confirmed": len(confirm_times),
+            "tracks_unconfirmed": unconfirmed,
+            "time_to_confirm_mean_s": float(np.mean(confirm_times)) if confirm_times else None,
+            "time_to_confirm_max_s": float(np.max(confirm_times)) if confirm_times else None,
+            "confirmed_ratio": confirmed_frames / active_frames if active_frames else 0.0,
+            "cpu_per_frame_ms": cpu / n * 1000,
+            "replay_speedup": duration / wall if wall > 0 else None,
+            "cache_hits": self.cache_hits,
+            "cache_misses": self.cache_misses,
+            "stale_detections": self.stale_detections,
+            "stale_descriptors": self.stale_descriptors
+        }
+
+
+def replay_session(session, params=None, recompute=True):
+    return ReplayEngine(session, params, recompute).run()
+
+
+def diff_metrics(current, baseline):
+    """
+    Bandingkan metrik dengan baseline.
+    Return: dict {metrik: (baseline, current, delta)}
+    """
+    diff = {}
+    for key, value in current.items():
+        base = baseline.get(key)
+        delta = None
+        if isinstance(value, (int, float)) and isinstance(base, (int, float)):
+            delta = value - base
+        diff[key] = (base, value, delta)
+    return diff
+
+
+def load_baseline(path):
+    with open(path, "r") as f:
+        return json.load(f)
+
+
+def save_baseline(metrics, path):
+    with open(path, "w") as f:
+        json.dump(metrics, f, indent=2)
+    print(f">> [REPLAY] Baseline disimpan: {path}")
@@ -0,0 +1,361 @@
+import multiprocessing as mp
+import queue
+import time
+import numpy as np
+from multiprocessing import shared_memory
+
+EMBED_DIM = 128
+# Tasks unanswered this long are reclaimed (covers workers lost outside a task)
+TASK_TIMEOUT_S = 10.0
+# Restarts allowed per worker before the pool stops replacing dead processes
+MAX_RESTARTS = 3
+
+
+class SharedGallery:
+    """
+    Matrix encoding gallery (N x 128, float32) di shared memory.
+    Owner membuat & meng-unlink block, worker hanya attach (zero-copy).
+    """
+    def __init__(self, shm, count, owner):
+        self.shm = shm
+        self.count = count
+        self.owner = owner
+        self.matrix = np.ndarray((count, EMBED_DIM), dtype=np.float32, buffer=shm.buf)
+
+    @classmethod
+    def create(cls, encodings):
+        matrix = np.asarray(encodings, dtype=np.float32).reshape(-1, EMBED_DIM)
+        shm = shared_memory.SharedMemory(create=True, size=max(matrix.nbytes, 1))
+        gallery = cls(shm, len(matrix), owner=True)
+        gallery.matrix[:] = matrix
+        return gallery
+
+    @classmethod
+    def attach(cls, name, count):
+        return cls(shared_memory.SharedMemory(name=name), count, owner=False)
+
+    @property
+    def name(self):
+        return self.shm.name
+
+    @property
+    def descriptor(self):
+        return self.shm.name, self.count
+
+    def close(self):
+        # Views must be released before the buffer can be closed
+        self.matrix = None
+        self.shm.close()
+        if self.owner:
+            self.shm.unlink()
+
+
+class SharedFrameRing:
+    """
+    Ring buffer frame RGB di shared memory.
+    Header int64 per slot menyimpan frame index yang sedang ada di slot tsb,
+    sehingga worker bisa mendeteksi frame yang sudah tertimpa.
+    """
+    def __init__(self, shm, slots, shape, owner):
+        self.shm = shm
+        self.slots = slots
+        self.shape = tuple(shape)
+        self.owner = owner
+
+        header_size = slots * 8
+        self.header = np.ndarray((slots,), dtype=np.int64, buffer=shm.buf)
+        self.frames = np.ndarray((slots,) + self.shape, dtype=np.uint8,
+                                 buffer=shm.buf, offset=header_size)
+
+    @classmethod
+    def create(cls, slots, shape):
+        size = slots * 8 + slots * int(np.prod(shape))
+        ring = cls(shared_memory.SharedMemory(create=True, size=size), slots, shape, owner=True)
+        ring.header[:] = -1
+        return ring
+
+    @classmethod
+    def attach(cls, name, slots, shape):
+        return cls(shared_memory.SharedMemory(name=name), slots, shape, owner=False)
+
+    @property
+    def descriptor(self):
+        return self.shm.name, self.slots, self.shape
+
+    def write(self, slot, frame_idx, image):
+        self.header[slot] = -1
+        self.frames[slot] = image
+        self.header[slot] = frame_idx
+
+    def view(self, slot, frame_idx):
+        if self.header[slot] != frame_idx:
+            return None
+        return self.frames[slot]
+
+    def is_current(self, slot, frame_idx):
+        return self.header[slot] == frame_idx
+
+    def close(self):
+        self.header = None
+        self.frames = None
+        self.shm.close()
+        if self.owner:
+            self.shm.unlink()
+
+
+def match_gallery(matrix, descriptor):
+    # Vectorized nearest match, returns (index, distance) or (-1, inf) for an empty gallery
+    if len(matrix) == 0:
+        return -1, float("inf")
+    dists = np.linalg.norm(matrix - descriptor, axis=1)
+    best = int(np.argmin(dists))
+    return best, float(dists[best])
+
+
+def recognition_worker(model_paths, ring_desc, task_queue, result_queue, current_task):
+    """
+    Proses worker: landmarks + descriptor + matching.
+    Task  : (task_id, frame_idx, ring_slot, slot_id, rect, gallery_desc) atau None untuk berhenti
+    Result: (task_id, gallery_name, descriptor, best_idx, distance); descriptor None = dibuang
+    current_task menyimpan task_id yang sedang dikerjakan, agar owner bisa
+    mengambil kembali task tsb jika proses ini mati.
+    """
+    import dlib
+
+    predictor = dlib.shape_predictor(model_paths[0])
+    face_rec_model = dlib.face_recognition_model_v1(model_paths[1])
+    ring = SharedFrameRing.attach(*ring_desc)
+    gallery = None
+
+    try:
+        while True:
+            task = task_queue.get()
+            if task is None: break
+
+            task_id, frame_idx, ring_slot, slot_id, rect, gallery_desc = task
+            current_task.value = task_id
+            result = (task_id, gallery_desc[0], None, -1, float("inf"))
+
+            try:
+                # Re-attach only when the owner published a new gallery
+                if gallery is None or gallery.name != gallery_desc[0]:
+                    if gallery: gallery.close()
+                    gallery = None
+                    try:
+                        gallery = SharedGallery.attach(*gallery_desc)
+                    except FileNotFoundError:
+                        pass
+
+                image = ring.view(ring_slot, frame_idx) if gallery is not None else None
+                if image is not None:
+                    shape = predictor(image, dlib.rectangle(*rect))
+                    descriptor = np.array(face_rec_model.compute_face_descriptor(image, shape), dtype=np.float32)
+
+                    # Frame overwritten while we were reading it
+                    if ring.is_current(ring_slot, frame_idx):
+                        best, dist = match_gallery(gallery.matrix, descriptor)
+                        result = (task_id, gallery_desc[0], descriptor, best, dist)
+            except Exception as e:
+                # A bad task must not take the worker down; the owner just sees it dropped
+                print(f">> [WORKER] Task frame {frame_idx} gagal: {e}")
+
+            result_queue.put(result)
+            current_task.value = -1
+    finally:
+        if gallery: gallery.close()
+        ring.close()
+
+
+class RecognitionPool:
+    """
+    Pool proses recognition. Gallery & frame dibagikan lewat shared memory,
+    queue hanya membawa descriptor kecil (frame index, slot ring, rect).
+    Semua method dipanggil dari satu thread (thread kamera); proses worker baru
+    dijalankan saat start() dipanggil dengan ukuran frame pertama.
+    poll() juga memeriksa worker: proses yang mati dijalankan ulang dan
+    task yang dipegangnya (atau yang tidak dijawab) diambil kembali.
+    """
+    def __init__(self, num_workers, model_paths):
+        self.num_workers = num_workers
+        self.model_paths = model_paths
+
+        # A ring slot stays taken until every task submitted with it has returned
+        self.max_pending = num_workers * 2
+        self.ring_slots = self.max_pending
+        self.free_slots = list(range(self.ring_slots))
+        self.slot_refs = [0] * self.ring_slots
+
+        # task_id -> (frame_idx, ring_slot, slot_id, rect, submitted_at)
+        self.in_flight = {}
+        self.next_task_id = 0
+
+        self.ring = None
+        self.gallery = None
+        self.gallery_names = []
+        self.ctx = None
+        self.workers = []
+        self.worker_tasks = []
+        self.restarts = 0
+        self.task_queue = None
+        self.result_queue = None
+
+    @property
+    def started(self):
+        return self.ring is not None
+
+    @property
+    def pending(self):
+        return len(self.in_flight)
+
+    def start(self, frame_shape):
+        self.ctx = mp.get_context("spawn")
+        self.ring = SharedFrameRing.create(self.ring_slots, frame_shape)
+        self.task_queue = self.ctx.Queue()
+        self.result_queue = self.ctx.Queue()
+
+        self.workers = [None] * self.num_workers
+        self.worker_tasks = [None] * self.num_workers
+        for i in range(self.num_workers):
+            self._spawn_worker(i)
+
+        print(f">> [WORKER] {self.num_workers} proses recognition berjalan.")
+
+    def _spawn_worker(self, i):
+        current_task = self.ctx.Value("q", -1)
+        worker = self.ctx.Process(
+            target=recognition_worker,
+            args=(self.model_paths, self.ring.descriptor, self.task_queue, self.result_queue, current_task),
+            daemon=True
+        )
+        worker.start()
+        self.workers[i] = worker
+        self.worker_tasks[i] = current_task
+
+    def update_gallery(self, database):
+        old = self.gallery
+        self.gallery = SharedGallery.create([data["encoding"] for data in database])
+        self.gallery_names = [data["name"] for data in database]
+
+        # Workers still holding the old block keep their mapping; only the name is released
+        if old: old.close()
+
+    def submit(self, frame_idx, image, requests):
+        """
+        requests: List of (slot_id, rect tuple)
+        Return: False jika pool penuh (frame dilewati)
+        """
+        if (self.gallery is None or not self.free_slots or
+                self.pending + len(requests) > self.max_pending):
+            return False
+
+        ring_slot = self.free_slots.pop()
+        self.ring.write(ring_slot, frame_idx, image)
+        self.slot_refs[ring_slot] = len(requests)
+        now = time.monotonic()
+        for slot_id, rect in requests:
+            task_id = self.next_task_id
+            self.next_task_id += 1
+            self.in_flight[task_id] = (frame_idx, ring_slot, slot_id, rect, now)
+            self.task_queue.put((task_id, frame_idx, ring_slot, slot_id, rect, self.gallery.descriptor))
+        return True
+
+    def _release(self, task_id):
+        # Idempotent: a late result for a reclaimed task is simply ignored
+        task = self.in_flight.pop(task_id, None)
+        if task is None:
+            return None
+
+        ring_slot = task[1]
+        self.slot_refs[ring_slot] -= 1
+        if self.slot_refs[ring_slot] == 0:
+            self.free_slots.append(ring_slot)
+        return task
+
+    def _check_workers(self):
+        for i, worker in enumerate(self.workers):
+            if worker is None or worker.is_alive():
+                continue
+
+            # The task it was holding will never be answered
+            lost = self.worker_tasks[i].value
+            if lost >= 0:
+                self._release(lost)
+
+            if self.restarts < MAX_RESTARTS * self.num_workers:
+                self.restarts += 1
+                print(f">> [WORKER] Proses {worker.pid} mati (exit {worker.exitcode}), dijalankan ulang.")
+                self._spawn_worker(i)
+            else:
+                print(f">> [WORKER] Proses {worker.pid} mati (exit {worker.exitcode}), batas restart tercapai.")
+                self.workers[i] = None
+
+        now = time.monotonic()
+        expired = [task_id for task_id, task in self.in_flight.items() if now - task[4] > TASK_TIMEOUT_S]
+        for task_id in expired:
+            self._release(task_id)
+        if expired:
+            print(f">> [WORKER] {len(expired)} task tanpa jawaban diambil kembali.")
+
+    def poll(self):
+        """
+        Ambil hasil yang sudah selesai tanpa blocking.
+        Return: List of (frame_idx, slot_id, rect, descriptor, name, distance);
+        name None jika hasil dicocokkan dengan gallery lama (descriptor tetap valid)
+        """
+        self._check_workers()
+
+        results = []
+        while True:
+            try:
+                task_id, gallery_name, descriptor, best, dist = self.result_queue.get_nowait()
+            except queue.Empty:
+                break
+
+            task = self._release(task_id)
+            if task is None:
+                continue
+
+            frame_idx, _, slot_id, rect, _ = task
+            if descriptor is None:
+                continue
+
+            name = None
+            if best >= 0 and self.gallery is not None and gallery_name == self.gallery.name:
+                name = self.gallery_names[best]
+            results.append((frame_idx, slot_id, rect, descriptor, name, dist))
+        return results
+
+    def stop(self, timeout=2.0):
+        if not self.started:
+            return
+
+        workers = [worker for worker in self.workers if worker is not None]
+        for _ in workers:
+            self.task_queue.put(None)
+
+        # One shared deadline for all workers instead of timeout per worker
+        deadline = time.monotonic() + timeout
+        for worker in workers:
+            worker.join(timeout=max(deadline - time.monotonic(), 0))
+        for worker in workers:
+            if worker.is_alive():
+                worker.terminate()
+                worker.join()
+        self.workers = []
+        self.worker_tasks = []
+        self.restarts = 0
+
+        for q in (self.task_queue, self.result_queue):
+            q.cancel_join_thread()
+            q.close()
+
+        if self.gallery:
+            self.gallery.close()
+            self.gallery = None
+        if self.ring:
+            self.ring.close()
+            self.ring = None
+        self.in_flight = {}
+        self.free_slots = list(range(self.ring_slots))
+        self.slot_refs = [0] * self.ring_slots
+        print(">> [WORKER] Semua proses recognition dihentikan, shared memory dibersihkan.")
@@ -74,6 +74,10 @@ class DatabaseWindow(ctk.CTkToplevel):
         self.selected_name = None
         self.list_buttons = []
 
+        self.btn_audit = ctk.CTkButton(self.left_frame, text="AUDIT GALLERY", fg_color="#333333",
+                                       hover_color="#555555", command=self.audit_action)
+        self.btn_audit.pack(pady=(10, 0), padx=10, fill="x")
+
         self.btn_delete = ctk.CTkButton(self.left_frame, text="DELETE SELECTED", fg_color="#cc0000",
                                         hover_color="#990000", state="disabled", command=self.delete_action)
         self.btn_delete.pack(pady=10, padx=10, fill="x")
@@ -103,15 +107,22 @@ class DatabaseWindow(ctk.CTkToplevel):
 
         self.refresh_list()
 
-    def refresh_list(self):
+    def refresh_list(self, margins=None):
         for btn in self.list_buttons:
             btn.destroy()
         self.list_buttons.clear()
         
         names = self.data_manager.get_face_list()
+        margins = margins or {}
         
         for name in names:
-            btn = ctk.CTkButton(self.scroll_list, text=name, fg_color="#333333", hover_color="#444444",
+            label = name
+            color = "#333333"
+            if name in margins:
+                label = f"{name}   (margin {margins[name]:+.2f})"
+                if margins[name] < 0: color = "#662222"
+
+            btn = ctk.CTkButton(self.scroll_list, text=label, fg_color=color, hover_color="#444444",
                                 anchor="w", command=lambda n=name: self.select_name(n))
             btn.pack(fill="x", pady=2)
             self.list_buttons.append(btn)
@@ -149,6 +160,20 @@ class DatabaseWindow(ctk.CTkToplevel):
         else:
             self.lbl_status.configure(text=msg, text_color="red")
 
+    def audit_action(self):
+        self.lbl_status.configure(text="Auditing gallery...", text_color="yellow")
+        self.update()
+
+        conflicts, report = self.data_manager.audit_gallery()
+        self.refresh_list({r["name"]: r["margin"] for r in report if r["nearest"]})
+
+        if conflicts:
+            name_a, name_b, dist = conflicts[0]
+            self.lbl_status.configure(text=f"{len(conflicts)} conflict(s)! {name_a} <-> {name_b} ({dist:.2f})",
+                                      text_color="red")
+        else:
+            self.lbl_status.configure(text="Audit OK: no conflicting faces.", text_color="#00ff00")
+
     def delete_action(self):
         if self.selected_name:
             success, msg = self.data_manager.delete_face(self.selected_name)